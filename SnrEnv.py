@@ -4,11 +4,12 @@ import cv2
 import numpy as np
 import pygame
 import random
+from collections import OrderedDict
 
 class SnrEnv(gym.Env):
     metadata = {"render_modes": ["human", "rgb_array"], "render_fps": 30}
 
-    def __init__(self, render_mode=None, GAME_DURATION=30):
+    def __init__(self, render_mode=None, GAME_DURATION=30, ATLAS_CAPACITY=None):
         super().__init__()
         pygame.init()
 
@@ -19,6 +20,7 @@ class SnrEnv(gym.Env):
         self.VIEWPORT_SIZE = 100
         self.SCALE_FACTOR = self.DISPLAY_WIDTH // self.VIEWPORT_SIZE
         self.TILE_SIZE = 20
+        self.OBS_SIZE = 84
         self.FPS = 30
         self.HUMAN_COUNT = 3
         self.GAME_DURATION = GAME_DURATION
@@ -63,11 +65,29 @@ class SnrEnv(gym.Env):
         self.game_over = False
         self.time_left = self.GAME_DURATION
 
+        # Episode statistics, reported in info when the episode ends
+        self.steps = 0
+        self.invalid_moves = 0
+        self.rescue_times = []
+
         self.set_humans()
 
+        # Precompute the downsampled map background for every reachable viewport
+        self.map_array = pygame.surfarray.array3d(self.map_surface).transpose((1, 0, 2)).astype(np.float32)
+        self.robot_sprite = self._get_sprite_arrays(self.robot)
+        self.human_sprites = [self._get_sprite_arrays(img) for img in self.humans]
+        self.resample = self._get_resample_matrix()
+        self.resample_support = self._get_support(self.resample)
+        self.atlas = OrderedDict()
+        self.atlas_hits, self.atlas_misses = 0, 0
+        origins = dict.fromkeys(self._viewport_origin(pos) for pos in self.path)
+        self.ATLAS_CAPACITY = ATLAS_CAPACITY or len(origins)
+        for origin in list(origins)[:self.ATLAS_CAPACITY]:
+            self.atlas[origin] = self._render_background(origin)
+
         # Define observation and action spaces
-        self.observation_space = spaces.Box(low=0, high=255, shape=(84, 84, 9), dtype=np.uint8)
-        self.frame_stack = np.zeros((84, 84, 3 * 3), dtype=np.uint8) 
+        self.observation_space = spaces.Box(low=0, high=255, shape=(self.OBS_SIZE, self.OBS_SIZE, 9), dtype=np.uint8)
+        self.frame_stack = np.zeros((self.OBS_SIZE, self.OBS_SIZE, 3 * 3), dtype=np.uint8) 
         self.action_space = spaces.Discrete(4)  # 0: Up, 1: Right, 2: Down, 3: Left
 
     def _get_floor_positions(self):
@@ -85,10 +105,15 @@ class SnrEnv(gym.Env):
                     return (x, y)
         return None
 
+    def _viewport_origin(self, robot_pos):
+        centerx, centery = robot_pos[0] + self.TILE_SIZE // 2, robot_pos[1] + self.TILE_SIZE // 2
+        viewport_x = max(0, min(centerx - self.VIEWPORT_SIZE // 2, self.MAP_WIDTH - self.VIEWPORT_SIZE))
+        viewport_y = max(0, min(centery - self.VIEWPORT_SIZE // 2, self.MAP_HEIGHT - self.VIEWPORT_SIZE))
+        return viewport_x, viewport_y
+
     def render_game_state(self, surface):
         # Calculate viewport
-        viewport_x = max(0, min(self.robot_rect.centerx - self.VIEWPORT_SIZE // 2, self.MAP_WIDTH - self.VIEWPORT_SIZE))
-        viewport_y = max(0, min(self.robot_rect.centery - self.VIEWPORT_SIZE // 2, self.MAP_HEIGHT - self.VIEWPORT_SIZE))
+        viewport_x, viewport_y = self._viewport_origin(self.robot_rect.topleft)
         viewport_surface = pygame.Surface((self.VIEWPORT_SIZE, self.VIEWPORT_SIZE))
 
         # Draw map, robot, and humans
@@ -101,12 +126,95 @@ class SnrEnv(gym.Env):
         scaled_viewport = pygame.transform.scale(viewport_surface, (self.DISPLAY_WIDTH, self.DISPLAY_HEIGHT))
         surface.blit(scaled_viewport, (0, 0))
 
+    def _get_sprite_arrays(self, img):
+        # Colour and blend weight per pixel, with the colorkey folded into the weight
+        rgb = pygame.surfarray.array3d(img).transpose((1, 0, 2)).astype(np.float32)
+        alpha = pygame.surfarray.array_alpha(img).T.astype(np.float32) / 255
+        alpha *= np.any(rgb != self.BLACK, axis=2)
+        return rgb, alpha[:, :, None]
+
+    def _get_resample_matrix(self):
+        # Weights of each viewport pixel in each observation pixel for the scale + INTER_AREA chain.
+        # The nearest-neighbour mapping is read back from pygame so it matches render_game_state.
+        line = pygame.Surface((self.VIEWPORT_SIZE, 1))
+        for i in range(self.VIEWPORT_SIZE):
+            line.set_at((i, 0), (i, 0, 0))
+        scaled = pygame.transform.scale(line, (self.DISPLAY_WIDTH, 1))
+        upscale = np.zeros((self.DISPLAY_WIDTH, self.VIEWPORT_SIZE), dtype=np.float32)
+        upscale[np.arange(self.DISPLAY_WIDTH), pygame.surfarray.array3d(scaled)[:, 0, 0]] = 1
+        downscale = cv2.resize(np.eye(self.DISPLAY_WIDTH, dtype=np.float32), (self.DISPLAY_WIDTH, self.OBS_SIZE),
+                               interpolation=cv2.INTER_AREA)
+        return downscale @ upscale
+
+    def _get_support(self, weights):
+        # For each input pixel, the range of output pixels it contributes to, and vice versa
+        nonzero = weights > 0
+        out_lo = nonzero.argmax(axis=0)
+        out_hi = nonzero.shape[0] - nonzero[::-1].argmax(axis=0)
+        in_lo = nonzero.argmax(axis=1)
+        in_hi = nonzero.shape[1] - nonzero[:, ::-1].argmax(axis=1)
+        return out_lo, out_hi, in_lo, in_hi
+
+    def _render_background(self, origin):
+        viewport_surface = pygame.Surface((self.VIEWPORT_SIZE, self.VIEWPORT_SIZE))
+        viewport_surface.blit(self.map_surface, (0, 0), (*origin, self.VIEWPORT_SIZE, self.VIEWPORT_SIZE))
+        scaled_viewport = pygame.transform.scale(viewport_surface, (self.DISPLAY_WIDTH, self.DISPLAY_HEIGHT))
+        obs = pygame.surfarray.array3d(scaled_viewport).transpose((1, 0, 2))
+        return cv2.resize(obs, (self.OBS_SIZE, self.OBS_SIZE), interpolation=cv2.INTER_AREA)
+
+    def _get_background(self, origin):
+        background = self.atlas.get(origin)
+        if background is not None:
+            self.atlas_hits += 1
+            self.atlas.move_to_end(origin)
+            return background
+
+        self.atlas_misses += 1
+        background = self._render_background(origin)
+        self.atlas[origin] = background
+        if len(self.atlas) > self.ATLAS_CAPACITY:
+            self.atlas.popitem(last=False)
+        return background
+
+    def get_atlas_stats(self):
+        lookups = self.atlas_hits + self.atlas_misses
+        return {
+            'hit_rate': self.atlas_hits / lookups if lookups else 0.0,
+            'entries': len(self.atlas),
+            'nbytes': sum(background.nbytes for background in self.atlas.values()),
+        }
+
     def get_rgb_observation(self):
-        surface = pygame.Surface((self.DISPLAY_WIDTH, self.DISPLAY_HEIGHT))
-        self.render_game_state(surface)
-        obs = pygame.surfarray.array3d(surface)
-        obs = obs.transpose((1, 0, 2))
-        obs = cv2.resize(obs, (84, 84), interpolation=cv2.INTER_AREA)
+        viewport_x, viewport_y = self._viewport_origin(self.robot_rect.topleft)
+        obs = self._get_background((viewport_x, viewport_y)).copy()
+
+        # Draw sprites onto the viewport crop, keeping the clipped box of each one
+        viewport = self.map_array[viewport_y:viewport_y + self.VIEWPORT_SIZE,
+                                  viewport_x:viewport_x + self.VIEWPORT_SIZE].copy()
+        sprites = [(self.robot_sprite, self.robot_rect)]
+        sprites += [(self.human_sprites[human_index], human_rect) for human_index, human_rect in self.human_rects]
+        boxes = []
+        for (rgb, alpha), rect in sprites:
+            x, y = rect.x - viewport_x, rect.y - viewport_y
+            x0, y0 = max(x, 0), max(y, 0)
+            x1, y1 = min(x + rect.width, self.VIEWPORT_SIZE), min(y + rect.height, self.VIEWPORT_SIZE)
+            if x0 >= x1 or y0 >= y1:
+                continue
+            region = viewport[y0:y1, x0:x1]
+            region += (rgb[y0 - y:y1 - y, x0 - x:x1 - x] - region) * alpha[y0 - y:y1 - y, x0 - x:x1 - x]
+            boxes.append((y0, y1, x0, x1))
+
+        # Recompute only the observation pixels that a sprite touches; the viewport is square,
+        # so rows and columns share one resampling matrix
+        out_lo, out_hi, in_lo, in_hi = self.resample_support
+        for y0, y1, x0, x1 in boxes:
+            r0, r1 = out_lo[y0], out_hi[y1 - 1]
+            c0, c1 = out_lo[x0], out_hi[x1 - 1]
+            a0, a1 = in_lo[r0], in_hi[r1 - 1]
+            b0, b1 = in_lo[c0], in_hi[c1 - 1]
+            block = np.einsum('ry,yxc,sx->rsc', self.resample[r0:r1, a0:a1], viewport[a0:a1, b0:b1],
+                              self.resample[c0:c1, b0:b1])
+            obs[r0:r1, c0:c1] = np.clip(np.rint(block), 0, 255)
         return obs
 
     def get_observation(self):
@@ -162,7 +270,9 @@ class SnrEnv(gym.Env):
             reward += 0.1  # Small reward for valid move
         else:
             reward -= 0.2  # Penalty for invalid move
+            self.invalid_moves += 1
 
+        self.steps += 1
         self.time_left -= 1 / self.FPS
 
         # Check for spotted and rescued humans
@@ -177,6 +287,7 @@ class SnrEnv(gym.Env):
             if self.robot_rect.colliderect(human_rect) and not self.rescued_humans[i]:
                 self.rescued_humans[i] = True
                 self.humans_saved += 1
+                self.rescue_times.append(self.GAME_DURATION - self.time_left)
                 reward += 10.0  # Large reward for rescuing a human
 
         # Check if the game is over
@@ -195,14 +306,28 @@ class SnrEnv(gym.Env):
 
         obs = self.get_observation()
         info = {'humans_saved': self.humans_saved, 'time_left': self.time_left}
+        if done:
+            info['episode_stats'] = self.get_episode_stats()
 
         return obs, reward, done, False, info
 
+    def get_episode_stats(self):
+        return {
+            'humans_saved': self.humans_saved,
+            'rescue_times': list(self.rescue_times),
+            'invalid_moves': self.invalid_moves,
+            'spotted': sum(self.spotted_humans),
+            'steps': self.steps,
+        }
+
     def reset(self, seed=None, options=None):    
         # Reset game variables
         self.humans_saved = 0
         self.game_over = False
         self.time_left = self.GAME_DURATION
+        self.steps = 0
+        self.invalid_moves = 0
+        self.rescue_times = []
         self.rescued_humans = [False] * self.HUMAN_COUNT
         self.spotted_humans = [False] * self.HUMAN_COUNT
         self.robot_rect.topleft = self.golden_pos
@@ -8,6 +8,7 @@ from stable_baselines3.common.monitor import Monitor
 from stable_baselines3.common.torch_layers import BaseFeaturesExtractor
 import torch
 import torch.nn as nn
+import numpy as np
 
 def make_env():
     env = gym.make('SnrEnv-v0', render_mode=None)
@@ -47,18 +48,88 @@ policy_kwargs = dict(
 )
 
 class TensorboardCallback(BaseCallback):
+    """
+    Aggregates the end-of-episode statistics reported by SnrEnv in info['episode_stats']
+    across all envs into fixed-bin histograms and logs them once per rollout.
+    """
+    # Fixed bin edges, so counts from every env can be accumulated without storing samples
+    STAT_BINS = {
+        'humans_saved': np.arange(-0.5, 4.5, 1.0),
+        'rescue_times': np.linspace(0, 30, 61),
+        'invalid_moves': np.linspace(0, 900, 91),
+        'spotted': np.arange(-0.5, 4.5, 1.0),
+        'steps': np.linspace(0, 900, 91),
+    }
+    PERCENTILES = (50, 90)
+
     def __init__(self, verbose=0):
         super(TensorboardCallback, self).__init__(verbose)
-        self.step_count = 0
-    
+        self.counts = {key: np.zeros(len(edges) - 1, dtype=np.int64) for key, edges in self.STAT_BINS.items()}
+        self.sums = dict.fromkeys(self.STAT_BINS, 0.0)
+        self.episodes = 0
+
+    def _add_samples(self, key, values):
+        values = np.asarray(values, dtype=np.float64)
+        if values.size == 0:
+            return
+        edges = self.STAT_BINS[key]
+        bins = np.clip(np.searchsorted(edges, values, side='right') - 1, 0, len(edges) - 2)
+        np.add.at(self.counts[key], bins, 1)
+        self.sums[key] += values.sum()
+
+    def _percentile(self, key, q):
+        counts = self.counts[key]
+        cdf = np.cumsum(counts)
+        idx = np.searchsorted(cdf, q / 100 * cdf[-1])
+        edges = self.STAT_BINS[key]
+        return (edges[idx] + edges[idx + 1]) / 2
+
     def _on_step(self) -> bool:
-        self.step_count += 1
-        if self.step_count % 900 == 0:  # Log every 1000 steps
-            value = self.training_env.get_attr('humans_saved')[0]
-            self.logger.record('humans_saved', value)
-            print(f"Step {self.step_count}: Humans saved: {value}")
+        finished = np.flatnonzero(self.locals['dones'])
+        if finished.size == 0:
+            return True
+
+        infos = self.locals['infos']
+        stats = [infos[i]['episode_stats'] for i in finished if 'episode_stats' in infos[i]]
+        for key in self.STAT_BINS:
+            if key == 'rescue_times':
+                self._add_samples(key, [t for s in stats for t in s[key]])
+            else:
+                self._add_samples(key, [s[key] for s in stats])
+        self.episodes += len(stats)
         return True
 
+    def _on_rollout_end(self) -> None:
+        # One call per rollout, so the cost does not grow with the step count
+        atlas_stats = self.training_env.env_method('get_atlas_stats')
+        self.logger.record('atlas/hit_rate', np.mean([stats['hit_rate'] for stats in atlas_stats]))
+        self.logger.record('atlas/nbytes', sum(stats['nbytes'] for stats in atlas_stats))
+
+        if self.episodes == 0:
+            return
+
+        edges_mid = {key: (edges[:-1] + edges[1:]) / 2 for key, edges in self.STAT_BINS.items()}
+        for key, counts in self.counts.items():
+            total = counts.sum()
+            if total == 0:
+                continue
+            self.logger.record(f'episode_stats/{key}_mean', self.sums[key] / total)
+            for q in self.PERCENTILES:
+                self.logger.record(f'episode_stats/{key}_p{q}', self._percentile(key, q))
+            # Tensors are written as TensorBoard histograms; rebuilt from the bin counts
+            self.logger.record(f'episode_stats/{key}_hist', torch.as_tensor(np.repeat(edges_mid[key], counts)),
+                               exclude=('stdout', 'log', 'json', 'csv'))
+        self.logger.record('episode_stats/episodes', self.episodes)
+
+        if self.verbose > 0:
+            print(f"Step {self.num_timesteps}: {self.episodes} episodes, "
+                  f"mean humans saved: {self.sums['humans_saved'] / self.episodes:.2f}")
+
+        for counts in self.counts.values():
+            counts.fill(0)
+        self.sums = dict.fromkeys(self.STAT_BINS, 0.0)
+        self.episodes = 0
+
 # Create the callbacks
 eval_callback = EvalCallback(eval_env, best_model_save_path='./logs/',
                              log_path='./logs/', eval_freq=900,